@@ -5,8 +5,9 @@
 # específico para a tabela "Resumo por Vistoriador".
 # ------------------------------------------------------------
 
-import os, re, json
-from datetime import datetime, date
+import os, re, json, time, random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from typing import Tuple, List, Optional
 
 import streamlit as st
@@ -43,11 +44,32 @@ st.markdown("""
 def _nt(txt: str) -> str:
     return f"<span class='notranslate' translate='no'>{txt}</span>"
 
+_CARD_TMPL = "<div class='card'><h4>{0}</h4><h2>{1}</h2></div>"
+
+def _cards_html(cards: List[Tuple[str, str]]) -> str:
+    return '<div class="card-container">' + "".join(_CARD_TMPL.format(t, v) for t, v in cards) + "</div>"
+
+# troca "," <-> "." numa passada só (milhar "." e decimal "," do pt-BR)
+_BR_TRANS = str.maketrans(",.", ".,")
+
+def _br_num(x, casas: int = 0) -> str:
+    return f"{x:,.{casas}f}".translate(_BR_TRANS)
+
+_MILHAR_RE = r"\B(?=(\d{3})+(?!\d))"
+
+def _fmt_int_br(s: pd.Series) -> pd.Series:
+    # inteiro com separador de milhar "." (pt-BR), sem formatar valor a valor em Python
+    return s.astype("int64").astype(str).str.replace(_MILHAR_RE, ".", regex=True)
+
+def _fmt_dec_br(s: pd.Series, casas: int = 1) -> pd.Series:
+    # mesmo texto de _br_num(x, casas), vetorizado: "%.Nf" em lote, vírgula decimal, milhar "."
+    txt = np.char.mod(f"%.{casas}f", s.to_numpy(dtype=float))
+    return (pd.Series(txt, index=s.index, dtype=object)
+            .str.replace(".", ",", regex=False).str.replace(_MILHAR_RE, ".", regex=True))
+
 # =========================
 # Conexão Google Sheets (silenciosa)
 # =========================
-SERVICE_EMAIL = None
-
 def _load_sa_info():
     try:
         block = st.secrets["gcp_service_account"]
@@ -72,16 +94,18 @@ def _load_sa_info():
             st.stop()
     return dict(block), "dict"
 
+@st.cache_resource(show_spinner=False)
 def make_client():
-    global SERVICE_EMAIL
+    # recurso compartilhado entre reruns/sessões: nada de estado global mutado aqui dentro
     info, _ = _load_sa_info()
-    SERVICE_EMAIL = info.get("client_email", "(sem client_email)")
     scopes = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds = ServiceAccountCredentials.from_json_keyfile_dict(info, scopes)
     return gspread.authorize(creds)
 
 # ---- util: pegar ID de URL/ID
 ID_RE = re.compile(r'/d/([a-zA-Z0-9-_]+)')
+RAW_ID_RE = re.compile(r'[a-zA-Z0-9-_]{20,}')
+MES_TITULO_RE = re.compile(r'(\d{2})/(\d{4})')
 
 def extract_sheet_id(s: str) -> Optional[str]:
     s = (s or "").strip()
@@ -90,55 +114,82 @@ def extract_sheet_id(s: str) -> Optional[str]:
     m = ID_RE.search(s)
     if m:
         return m.group(1)
-    if re.fullmatch(r'[a-zA-Z0-9-_]{20,}', s):
+    if RAW_ID_RE.fullmatch(s):
         return s
     return None
 
 # ---- helpers diversos
-def parse_date_any(x):
-    if pd.isna(x) or x == "": return pd.NaT
-    s = str(x).strip()
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except:
-            pass
-    try:
-        return pd.to_datetime(s).date()
-    except:
-        return pd.NaT
-
-def _upper_strip(x):
-    return str(x).upper().strip() if pd.notna(x) else ""
+# texto em Arrow (pyarrow vem com o streamlit): strip/upper/comparações em C;
+# sem pyarrow cai no "string" padrão do pandas
+try:
+    import pyarrow  # noqa: F401
+    _STR = pd.StringDtype("pyarrow")
+except ImportError:
+    _STR = "string"
+
+def parse_date_series(s: pd.Series) -> pd.Series:
+    # vetorizado: tenta cada formato só nas linhas que ainda não parsearam
+    # (ISO não pode ir com dayfirst=True, senão "2025-03-04" vira 03/04)
+    s = s.astype(_STR).str.strip()
+    tem_txt = s.fillna("").ne("").to_numpy()
+    out = pd.to_datetime(s, format="%d/%m/%Y", errors="coerce")
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "mixed"):
+        miss = out.isna().to_numpy() & tem_txt
+        if not miss.any():
+            break
+        out = out.fillna(pd.to_datetime(s.where(miss), format=fmt, errors="coerce"))
+    return out.dt.normalize()
+
+def _col_upper_strip(s: pd.Series) -> pd.Series:
+    # maiúsculas sem espaços nas pontas; vazio/NaN vira ""
+    return s.astype(_STR).str.strip().str.upper().fillna("")
+
+def _tipo_rank(s: pd.Series) -> pd.Series:
+    # TIPO para os rankings (após merge: sem meta vira NaN -> "—")
+    return _col_upper_strip(s).replace({"MOVEL": "MÓVEL", "": "—"})
 
 def infer_year_month_from_sheet(sh_title: str, df_data: pd.DataFrame) -> Optional[str]:
-    m = re.search(r'(\d{2})/(\d{4})', sh_title or "")
+    m = MES_TITULO_RE.search(sh_title or "")
     if m:
         mm, yyyy = m.group(1), m.group(2)
         return f"{yyyy}-{mm}"
     if "DATA" in df_data.columns:
-        d = df_data["DATA"].dropna()
-        if len(d):
-            try:
-                dd = min(d)
-                if isinstance(dd, date):
-                    return f"{dd.year}-{dd.month:02d}"
-            except:
-                pass
+        dd = pd.to_datetime(df_data["DATA"], errors="coerce").min()
+        if pd.notna(dd):
+            return f"{dd.year}-{dd.month:02d}"
     return None
 
+def _values_to_df(values: list) -> pd.DataFrame:
+    # 1ª linha = cabeçalho (já sem espaços e em maiúsculas); a API corta células vazias no fim da linha.
+    # O construtor do pandas completa as linhas curtas em C (dtype=object
+    # preserva os tipos da API); o reindex alinha ao tamanho do cabeçalho.
+    if not values:
+        return pd.DataFrame()
+    header = [str(c).strip().upper() for c in values[0]]
+    body = pd.DataFrame(values[1:], dtype=object).reindex(columns=range(len(header)))
+    body.columns = header
+    return body.fillna("")
+
 # =========================
 # Lê UMA planilha de mês (dados + METAS) e devolve AAAA-MM
 # =========================
 def read_one_sheet(gs_client, sheet_id: str) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
-    sh = gs_client.open_by_key(sheet_id)
-    title = sh.title or sheet_id
-
-    ws = sh.sheet1
-    data = pd.DataFrame(ws.get_all_records())
+    # 2 requisições por planilha: metadados (só título + nomes das abas) e um values:batchGet.
+    # direto no http_client: open_by_key já buscaria os metadados e sh.worksheets() de novo
+    http = gs_client.http_client
+    meta = http.fetch_sheet_metadata(sheet_id, params={"includeGridData": "false",
+                                                       "fields": "properties.title,sheets.properties.title"})
+    title = meta.get("properties", {}).get("title") or sheet_id
+
+    # dados (1ª aba) + METAS numa única chamada; sem METAS pede só os dados,
+    # em vez de deixar o batchGet falhar e repetir
+    abas = [w["properties"]["title"] for w in meta.get("sheets", [])]
+    ranges = ["'" + abas[0].replace("'", "''") + "'"] + (["METAS"] if "METAS" in abas else [])
+    params = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+    value_ranges = http.values_batch_get(sheet_id, ranges, params=params).get("valueRanges", [])
+    data = _values_to_df(value_ranges[0].get("values", []) if value_ranges else [])
 
     if not data.empty:
-        data.columns = [c.strip().upper() for c in data.columns]
         col_unid  = "UNIDADE"   if "UNIDADE"   in data.columns else None
         col_data  = "DATA"      if "DATA"      in data.columns else None
         col_chas  = "CHASSI"    if "CHASSI"    in data.columns else None
@@ -147,40 +198,39 @@ def read_one_sheet(gs_client, sheet_id: str) -> Tuple[pd.DataFrame, pd.DataFrame
         req = [col_unid, col_data, col_chas, (col_per or col_dig)]
         if any(r is None for r in req):
             raise ValueError(f"Planilha {title}: precisa conter UNIDADE, DATA, CHASSI, PERITO/DIGITADOR.")
-        data[col_unid] = data[col_unid].map(_upper_strip)
-        data[col_chas] = data[col_chas].map(_upper_strip)
-        data["__DATA__"] = data[col_data].apply(parse_date_any)
+        data[col_unid] = _col_upper_strip(data[col_unid])
+        data[col_chas] = _col_upper_strip(data[col_chas])
+        data["__DATA__"] = parse_date_series(data[col_data])
 
         # VISTORIADOR
         if col_per and col_dig:
-            data["VISTORIADOR"] = np.where(
-                data[col_per].astype(str).str.strip() != "",
-                data[col_per].map(_upper_strip),
-                data[col_dig].map(_upper_strip)
-            )
+            p = _col_upper_strip(data[col_per])
+            d = _col_upper_strip(data[col_dig])
+            data["VISTORIADOR"] = p.where(p != "", d)
         elif col_per:
-            data["VISTORIADOR"] = data[col_per].map(_upper_strip)
+            data["VISTORIADOR"] = _col_upper_strip(data[col_per])
         else:
-            data["VISTORIADOR"] = data[col_dig].map(_upper_strip)
+            data["VISTORIADOR"] = _col_upper_strip(data[col_dig])
 
-        # revistoria
-        data = data.sort_values(["__DATA__", col_chas], kind="mergesort").reset_index(drop=True)
-        data["__ORD__"] = data.groupby(col_chas).cumcount()
-        data["IS_REV"] = (data["__ORD__"] >= 1).astype(int)
+        # revistoria: 2ª+ ocorrência do chassi na ordem das datas.
+        # CHASSI vira category antes (categorias ordenadas = mesma ordem do texto):
+        # sort e duplicated trabalham nos códigos inteiros, sem hash de string
+        data[col_chas] = data[col_chas].astype("category")
+        data = data.sort_values(["__DATA__", col_chas], kind="stable", ignore_index=True)
+        data["IS_REV"] = data[col_chas].duplicated(keep="first").to_numpy().view(np.int8)
 
         # limpa unidades inválidas
         BAN_UNIDS = {"POSTO CÓDIGO", "POSTO CODIGO", "CÓDIGO", "CODIGO", "", "—", "NAN"}
         data = data[~data[col_unid].isin(BAN_UNIDS)].copy()
 
+        # baixa cardinalidade: category acelera groupby/isin/unique
+        for c in (col_unid, "VISTORIADOR"):
+            data[c] = data[c].astype("category")
+
     # METAS (opcional)
-    try:
-        metas_ws = sh.worksheet("METAS")
-        dfm = pd.DataFrame(metas_ws.get_all_records())
-    except Exception:
-        dfm = pd.DataFrame()
+    dfm = _values_to_df(value_ranges[1].get("values", []) if len(value_ranges) > 1 else [])
 
     if not dfm.empty:
-        dfm.columns = [c.strip().upper() for c in dfm.columns]
         ren = {}
         for cand in ["META_MENSAL", "META MEN SAL", "META_MEN SAL", "META_MEN.SAL", "META MENSA"]:
             if cand in dfm.columns: ren[cand] = "META_MENSAL"
@@ -188,71 +238,265 @@ def read_one_sheet(gs_client, sheet_id: str) -> Tuple[pd.DataFrame, pd.DataFrame
             if cand in dfm.columns: ren[cand] = "DIAS_UTEIS"
         dfm = dfm.rename(columns=ren)
         if "VISTORIADOR" in dfm.columns:
-            dfm["VISTORIADOR"] = dfm["VISTORIADOR"].map(_upper_strip)
+            dfm["VISTORIADOR"] = _col_upper_strip(dfm["VISTORIADOR"])
         if "UNIDADE" in dfm.columns:
-            dfm["UNIDADE"] = dfm["UNIDADE"].astype(str).map(_upper_strip)
-        dfm["TIPO"] = dfm.get("TIPO", "").astype(str).map(_upper_strip)
-        dfm["META_MENSAL"] = pd.to_numeric(dfm.get("META_MENSAL", 0), errors="coerce").fillna(0).astype(int)
-        dfm["DIAS_UTEIS"]  = pd.to_numeric(dfm.get("DIAS_UTEIS", 0),  errors="coerce").fillna(0).astype(int)
-
-    ym = infer_year_month_from_sheet(title, data.rename(columns={"__DATA__": "DATA"}) if "__DATA__" in data.columns else data)
+            dfm["UNIDADE"] = _col_upper_strip(dfm["UNIDADE"])
+        dfm["TIPO"] = _col_upper_strip(dfm["TIPO"]) if "TIPO" in dfm.columns else ""
+        dfm["META_MENSAL"] = pd.to_numeric(dfm.get("META_MENSAL", 0), errors="coerce").fillna(0).astype(np.int32)
+        dfm["DIAS_UTEIS"]  = pd.to_numeric(dfm.get("DIAS_UTEIS", 0),  errors="coerce").fillna(0).astype(np.int32)
+        for c in ("TIPO", "UNIDADE"):
+            if c in dfm.columns:
+                dfm[c] = dfm[c].astype("category")
+
+    ym = infer_year_month_from_sheet(title, data[["__DATA__"]].rename(columns={"__DATA__": "DATA"}) if "__DATA__" in data.columns else data)
     if ym is None:
         ym = "0000-00"
 
-    if not data.empty:
-        data["__YM__"] = data["__DATA__"].apply(lambda d: f"{d.year}-{d.month:02d}" if isinstance(d, date) else None)
     if not dfm.empty:
         dfm["__YM__"] = ym
 
     return data, dfm, title
 
+@st.cache_data(persist="disk", show_spinner=False)
+def _read_versioned(sheet_id: str, versao: str) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
+    # cache por (sheet_id, modifiedTime), também em disco: arquivo sem alteração não volta
+    # ao Google nem depois de reiniciar o app; modifiedTime novo muda a chave.
+    # persist="disk" ignora ttl. A versão anterior sai (memória e disco) em _sheet_keys, mas só
+    # a que este processo viu: após reiniciar/publicar, os .pickle antigos ficam no disco até
+    # o "Atualizar dados" (max_entries não ajudaria: só limita a memória, o Streamlit não poda o disco)
+    return read_one_sheet(make_client(), sheet_id)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _read_cached(sheet_id: str, janela: str) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
+    # sem modifiedTime: só memória, chave muda a cada janela de 10 min (não acumula em disco)
+    return read_one_sheet(make_client(), sheet_id)
+
 # =========================
 # Leitura SILENCIOSA da PLANILHA-ÍNDICE
 # =========================
 def _yes(v) -> bool:
     return str(v).strip().upper() in {"S", "SIM", "TRUE", "T", "1", "Y", "YES"}
 
-def load_ids_from_index(gs_client) -> List[str]:
+@st.cache_resource(show_spinner=False)
+def _janela_offset() -> float:
+    # deslocamento aleatório sorteado uma vez por processo (o script roda de novo a cada rerun):
+    # as janelas das réplicas não viram no mesmo instante nem releem o Google juntas
+    return random.uniform(0, 600)
+
+def _janela(periodo: int = 600) -> str:
+    return f"~{int((time.time() + _janela_offset()) // periodo)}"
+
+# índice e versões: chave = janela de 5 min com o deslocamento do processo (o ttl fixo
+# venceria junto nas réplicas); o ttl só descarta as chaves de janelas passadas
+@st.cache_data(ttl=600, show_spinner=False)
+def load_ids_from_index(janela: str) -> List[str]:
+    # erro de leitura sobe (exceção não entra no cache): quem chama trata
+    sh = make_client().open_by_key(INDEX_SHEET_ID)
+    # lê só os valores da aba (sem o lookup de metadados do worksheet)
+    idx = _values_to_df(sh.values_get(INDEX_TAB_NAME).get("values", []))
+    if idx.empty: return []
+    norm = idx.to_dict("records")
+    ativos = [r for r in norm if _yes(r.get("ATIVO", "S"))]
+    ids = []
+    for r in ativos:
+        sid = extract_sheet_id(str(r.get("URL","")))
+        if sid: ids.append(sid)
+    return ids
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_versions(ids: Tuple[str, ...], janela: str) -> dict:
+    # modifiedTime só das planilhas do índice (files.get por id, em paralelo),
+    # não a listagem de tudo que a conta de serviço enxerga no Drive
+    if not ids:
+        return {}
+    http = make_client().http_client
+    def _mod(sid: str) -> str:
+        # id sem acesso/removido ("" = sem versão): só ele cai na janela de 10 min,
+        # e o resultado entra no cache como os demais (nada de files.get a cada rerun)
+        try:
+            return http.get_file_drive_metadata(sid).get("modifiedTime", "")
+        except Exception:
+            return ""
+    with ThreadPoolExecutor(max_workers=min(8, len(ids))) as ex:
+        return dict(zip(ids, ex.map(_mod, ids)))
+
+@st.cache_resource(show_spinner=False)
+def _versoes_lidas() -> dict:
+    # última versão de cada planilha usada neste processo (compartilhado entre sessões);
+    # começa vazio a cada início do app, então não conhece as versões gravadas antes no disco
+    return {}
+
+@st.cache_resource(show_spinner=False)
+def _falhas_recentes() -> dict:
+    # (sheet_id, versão) que falhou -> janela em que falhou: não tenta de novo a cada clique
+    return {}
+
+def _sheet_keys(ids: List[str]) -> Tuple[Tuple[str, str], ...]:
+    # sem modifiedTime (Drive indisponível/arquivo não listado): versão = janela de 10 min,
+    # o mesmo prazo que o cache por sheet_id tinha antes
     try:
-        sh = gs_client.open_by_key(INDEX_SHEET_ID)
-        ws = sh.worksheet(INDEX_TAB_NAME)
-        rows = ws.get_all_records()
-        if not rows: return []
-        norm = [{str(k).strip().upper(): r[k] for k in r} for r in rows]
-        ativos = [r for r in norm if _yes(r.get("ATIVO", "S"))]
-        ids = []
-        for r in ativos:
-            sid = extract_sheet_id(str(r.get("URL","")))
-            if sid: ids.append(sid)
-        return ids
+        versoes = load_versions(tuple(ids), _janela(300))
     except Exception:
-        return []
+        versoes = {}
+    janela = _janela()
+    keys = tuple((sid, versoes.get(sid) or janela) for sid in ids)
+    # modifiedTime novo: a cópia da versão anterior não serve mais, sai da memória e do disco
+    lidas = _versoes_lidas()
+    for sid, versao in keys:
+        if versao.startswith("~"):
+            continue
+        antiga = lidas.get(sid)
+        if antiga and antiga != versao:
+            _read_versioned.clear(sid, antiga)
+        lidas[sid] = versao
+    return keys
 
 # =========================
 # Entrada – múltiplas planilhas (sempre via índice)
 # =========================
-client = make_client()
-sheet_ids: List[str] = load_ids_from_index(client)
+def cb_refresh():
+    # índice/versões em cache por 5 min, planilhas até mudarem no Drive; o botão força reler tudo
+    # (clear também apaga as cópias em disco, inclusive versões antigas de antes de reiniciar)
+    st.cache_data.clear()
+    _falhas_recentes().clear()
+
+st.button("🔄 Atualizar dados", on_click=cb_refresh)
+
+try:
+    sheet_ids: List[str] = load_ids_from_index(_janela(300))
+except Exception as e:
+    st.error("Não consegui ler a planilha-índice. Verifique o compartilhamento com a conta de serviço.")
+    with st.expander("Detalhes técnicos"):
+        st.exception(e)
+    st.stop()
 
 if not sheet_ids:
     st.error("Não encontrei dados ativos no índice. Verifique o compartilhamento/ATIVO na planilha-índice.")
     st.stop()
 
-all_df, all_metas = [], []
-for sid in sheet_ids:
+def _concat_cat(frames: List[pd.DataFrame], cols: Tuple[str, ...]) -> pd.DataFrame:
+    # categorias unificadas antes do concat: a coluna segue category, sem passar por object
+    dtypes = {}
+    for c in cols:
+        if all(c in f.columns and isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames):
+            cats = pd.api.types.union_categoricals([f[c] for f in frames], sort_categories=True).categories
+            dtypes[c] = pd.CategoricalDtype(cats)
+    out = pd.concat([f.astype(dtypes) for f in frames] if dtypes else frames, ignore_index=True)
+    # coluna ausente/não-category em alguma planilha: o concat devolve object, recategoriza
+    for c in cols:
+        if c in out.columns and c not in dtypes:
+            out[c] = out[c].astype("category")
+    return out
+
+def _load_one(key: Tuple[str, str]):
+    sid, versao = key
     try:
-        dfi, dmf, _ = read_one_sheet(client, sid)
+        if versao.startswith("~"):
+            return _read_cached(sid, versao)
+        return _read_versioned(sid, versao)
+    except Exception:
+        return None
+
+class _AssembleIncompleto(Exception):
+    # alguma planilha falhou: o resultado parcial sai pela exceção, que não entra no cache
+    def __init__(self, falhas: List[str]):
+        super().__init__(falhas)
+        self.falhas = falhas
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _assemble(sheet_keys: Tuple[Tuple[str, str], ...]) -> Tuple[pd.DataFrame, dict, List[str]]:
+    # frames já concatenados ficam em cache: reruns não refazem o concat
+    # leitura I/O-bound: até 8 planilhas em paralelo
+    with ThreadPoolExecutor(max_workers=min(8, len(sheet_keys))) as ex:
+        results = list(ex.map(_load_one, sheet_keys))
+
+    all_df, all_metas, falhas = [], [], []
+    for key, res in zip(sheet_keys, results):
+        if res is None:
+            falhas.append(key[0])
+            continue
+        dfi, dmf, _ = res
         if not dfi.empty: all_df.append(dfi)
         if not dmf.empty: all_metas.append(dmf)
-    except Exception:
-        pass
 
-if len(all_df) == 0:
+    if len(all_df) == 0:
+        # exceção não entra no cache: a próxima execução tenta de novo
+        raise ValueError("Não consegui montar dados de nenhuma planilha.")
+    if falhas:
+        raise _AssembleIncompleto(falhas)
+
+    df = _concat_cat(all_df, ("UNIDADE", "VISTORIADOR", "CHASSI"))
+    df_metas_all = _concat_cat(all_metas, ("TIPO", "UNIDADE")) if len(all_metas) else pd.DataFrame()
+    # VISTORIADOR das metas com as categorias dos dados: os merges comparam códigos.
+    # meta de quem não aparece nos dados vira NaN e nunca casaria no left join
+    if "VISTORIADOR" in df_metas_all.columns:
+        df_metas_all["VISTORIADOR"] = df_metas_all["VISTORIADOR"].astype(df["VISTORIADOR"].dtype)
+        df_metas_all = df_metas_all[df_metas_all["VISTORIADOR"].notna()]
+
+    # meta sem DIAS_UTEIS na planilha -> dias úteis (seg-sex) do mês da meta;
+    # aqui e não no Resumo: o ranking diário (META_DIA) usa as mesmas metas
+    if not df_metas_all.empty:
+        mes = pd.to_datetime(df_metas_all["__YM__"], format="%Y-%m", errors="coerce")  # "0000-00" -> NaT
+        falta = ((df_metas_all["DIAS_UTEIS"] == 0) & (df_metas_all["META_MENSAL"] > 0) & mes.notna()).to_numpy()
+        if falta.any():
+            ini = mes.to_numpy()[falta].astype("datetime64[M]")
+            du = df_metas_all["DIAS_UTEIS"].to_numpy().copy()
+            du[falta] = np.busday_count(ini.astype("datetime64[D]"), (ini + 1).astype("datetime64[D]"))
+            df_metas_all = df_metas_all.assign(DIAS_UTEIS=du)
+
+    # metas particionadas por AAAA-MM uma vez: as seções fazem lookup em vez de filtrar.
+    # uma linha por vistoriador/mês (a última planilha vence): os merges abaixo são 1:1.
+    # as repetidas descartadas voltam para o aviso na tela
+    metas_repetidas: List[str] = []
+    if not df_metas_all.empty:
+        rep = df_metas_all.duplicated(["__YM__", "VISTORIADOR"], keep="last")
+        if rep.any():
+            metas_repetidas = sorted({f"{v} ({ym})" for v, ym in
+                                      zip(df_metas_all.loc[rep, "VISTORIADOR"], df_metas_all.loc[rep, "__YM__"])})
+            df_metas_all = df_metas_all[~rep]
+    metas_by_month = dict(tuple(df_metas_all.groupby("__YM__", sort=False))) if not df_metas_all.empty else {}
+    return df, metas_by_month, metas_repetidas
+
+sheet_keys = _sheet_keys(sheet_ids)
+# planilha que falhou nesta janela de 10 min fica de fora até a janela virar (ou até o botão);
+# assim a chave reduzida é a que fica em cache e o rerun não repete o _assemble completo
+janela = _janela()
+falhas_rec = _falhas_recentes()
+for k in [k for k, j in list(falhas_rec.items()) if j != janela]:
+    falhas_rec.pop(k, None)
+falhas: List[str] = [k[0] for k in sheet_keys if k in falhas_rec]
+sheet_keys = tuple(k for k in sheet_keys if k not in falhas_rec)
+if not sheet_keys:
     st.error("Não consegui montar dados de nenhuma planilha.")
     st.stop()
-
-df = pd.concat(all_df, ignore_index=True)
-df_metas_all = pd.concat(all_metas, ignore_index=True) if len(all_metas) else pd.DataFrame()
+while True:
+    try:
+        df, metas_by_month, metas_repetidas = _assemble(sheet_keys)
+        break
+    except _AssembleIncompleto as e:
+        # segue só com as planilhas lidas (essas já estão no cache por planilha)
+        for k in sheet_keys:
+            if k[0] in e.falhas:
+                falhas_rec[k] = janela
+        falhas += e.falhas
+        sheet_keys = tuple(k for k in sheet_keys if k[0] not in e.falhas)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+if falhas:
+    st.warning(f"Não consegui ler {len(falhas)} planilha(s) agora: {', '.join(falhas)}. "
+               "Os números abaixo não as incluem; nova tentativa em até 10 min ou em 🔄 Atualizar dados.")
+if metas_repetidas:
+    st.warning("METAS repetidas para o mesmo vistoriador no mês; usei só a última linha (última planilha): "
+               + ", ".join(metas_repetidas))
+
+# mês sem metas: mesmas colunas/dtypes do loader (META_MENSAL/DIAS_UTEIS já int32)
+_EMPTY_METAS = pd.DataFrame({
+    "VISTORIADOR": pd.Series(dtype=df["VISTORIADOR"].dtype),
+    "TIPO": pd.Series(dtype="string"),
+    "META_MENSAL": pd.Series(dtype=np.int32),
+    "DIAS_UTEIS": pd.Series(dtype=np.int32),
+})
 
 # =========================
 # Continuação
@@ -269,21 +513,19 @@ def _init_state():
     st.session_state.setdefault("vists_tmp", [])
 _init_state()
 
-unidades_opts = sorted([u for u in df[col_unid].dropna().unique()])
-vist_opts = sorted([v for v in df["VISTORIADOR"].dropna().unique() if v])
+# categorias = valores distintos: O(#categorias) em vez de varrer as linhas
+unidades_opts = df[col_unid].cat.categories.sort_values().tolist()
+vist_opts = [v for v in df["VISTORIADOR"].cat.categories.sort_values().tolist() if v]
 
+# on_click já dispara o rerun depois do callback; st.rerun() aqui dobraria o custo
 def cb_sel_all_vists():
     st.session_state.vists_tmp = vist_opts[:]
-    st.rerun()
 def cb_clear_vists():
     st.session_state.vists_tmp = []
-    st.rerun()
 def cb_sel_all_unids():
     st.session_state.unids_tmp = unidades_opts[:]
-    st.rerun()
 def cb_clear_unids():
     st.session_state.unids_tmp = []
-    st.rerun()
 
 # =========================
 # Filtros (UI)
@@ -298,9 +540,10 @@ with colU2:
     b1.button("Selecionar todas (Unid.)", use_container_width=True, on_click=cb_sel_all_unids)
     b2.button("Limpar (Unid.)", use_container_width=True, on_click=cb_clear_unids)
 
-datas_validas = [d for d in df["__DATA__"] if isinstance(d, date)]
-dmin = min(datas_validas) if datas_validas else date.today()
-dmax = max(datas_validas) if datas_validas else date.today()
+# min/max já ignoram NaT; sem nenhuma data válida ambos voltam NaT
+_dmin, _dmax = df["__DATA__"].min(), df["__DATA__"].max()
+dmin = _dmin.date() if pd.notna(_dmin) else date.today()
+dmax = _dmax.date() if pd.notna(_dmax) else date.today()
 
 if "dt_ini" not in st.session_state:
     st.session_state["dt_ini"] = dmin
@@ -324,13 +567,37 @@ with colV2:
 # =========================
 # Aplicar filtros globais
 # =========================
-view = df.copy()
-if st.session_state.unids_tmp:
-    view = view[view[col_unid].isin(st.session_state.unids_tmp)]
-if st.session_state.dt_ini and st.session_state.dt_fim:
-    view = view[(view["__DATA__"] >= st.session_state.dt_ini) & (view["__DATA__"] <= st.session_state.dt_fim)]
-if st.session_state.vists_tmp:
-    view = view[view["VISTORIADOR"].isin(st.session_state.vists_tmp)]
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _filtered_view(sheet_keys: Tuple[Tuple[str, str], ...], unids: Tuple[str, ...], dt_ini: Optional[date],
+                   dt_fim: Optional[date], vists: Tuple[str, ...]) -> pd.DataFrame:
+    # chave = planilhas + filtros (tuplas pequenas): voltar a um filtro já usado não refaz as máscaras
+    df = _assemble(sheet_keys)[0]
+    # máscaras combinadas em numpy e um único recorte (sem cópias intermediárias)
+    # seleção que cobre todas as categorias ("Selecionar todas") não filtra nada: pula o isin
+    mask = np.ones(len(df), dtype=bool)
+    if unids and not set(df[col_unid].cat.categories).issubset(unids):
+        mask &= df[col_unid].isin(unids).to_numpy()
+    if dt_ini and dt_fim:
+        d = df["__DATA__"]
+        mask &= ((d >= pd.Timestamp(dt_ini)) & (d <= pd.Timestamp(dt_fim))).to_numpy()
+    if vists and not set(df["VISTORIADOR"].cat.categories).issubset(vists):
+        mask &= df["VISTORIADOR"].isin(vists).to_numpy()
+    return df.loc[mask]
+
+# mesma chave serve às seções cacheadas abaixo (auditoria), sem hashear o DataFrame
+filtro_key = (sheet_keys, tuple(sorted(st.session_state.unids_tmp)),
+              st.session_state.dt_ini, st.session_state.dt_fim,
+              tuple(sorted(st.session_state.vists_tmp)))
+view = _filtered_view(*filtro_key)
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _dias_disponiveis(filtro_key: tuple) -> np.ndarray:
+    # dias distintos da view, ordenados (datetime64[D]): uma passada serve ao mês de
+    # referência (último dia) e ao ranking do dia; pd.unique + sort só dos distintos
+    d = _filtered_view(*filtro_key)["__DATA__"].dropna().to_numpy(dtype="datetime64[D]")
+    return np.sort(pd.unique(d))
+
+dias_view = _dias_disponiveis(filtro_key)
 
 if view.empty:
     st.info("Nenhum registro para os filtros aplicados.")
@@ -344,90 +611,83 @@ liq_total         = int(vistorias_total - revistorias_total)
 pct_rev           = (100 * revistorias_total / vistorias_total) if vistorias_total else 0.0
 
 cards = [
-    ("Vistorias (geral)",   f"{vistorias_total:,}".replace(",", ".")),
-    ("Vistorias líquidas",  f"{liq_total:,}".replace(",", ".")),
-    (_nt("Revistorias"),    f"{revistorias_total:,}".replace(",", ".")),
-    (_nt("% Revistorias"),  f"{pct_rev:,.1f}%".replace(",", "X").replace(".", ",").replace("X", ".")),
+    ("Vistorias (geral)",   _br_num(vistorias_total)),
+    ("Vistorias líquidas",  _br_num(liq_total)),
+    (_nt("Revistorias"),    _br_num(revistorias_total)),
+    (_nt("% Revistorias"),  _br_num(pct_rev, 1) + "%"),
 ]
-st.markdown('<div class="card-container">' + "".join([f"<div class=\'card\'><h4>{t}</h4><h2>{v}</h2></div>" for t, v in cards]) + "</div>", unsafe_allow_html=True)
+st.markdown(_cards_html(cards), unsafe_allow_html=True)
 
 # =========================
 # Resumo por Vistoriador  (AGORA COM FILTRO FIXO/MÓVEL)
 # =========================
 st.markdown("<div class='section-title'>📋 Resumo por Vistoriador</div>", unsafe_allow_html=True)
 
+# dias úteis trabalhados = datas distintas de seg-sex (fim de semana vira NaT)
+_is_bd = np.is_busday(view["__DATA__"].to_numpy(dtype="datetime64[D]"))
 grp = (view
-       .groupby("VISTORIADOR", dropna=False)
+       .assign(__WD__=view["__DATA__"].where(_is_bd))
+       .groupby("VISTORIADOR", dropna=False, observed=True)
        .agg(
             VISTORIAS=("IS_REV", "size"),
             REVISTORIAS=("IS_REV", "sum"),
-            DIAS_ATIVOS=("__DATA__", lambda s: s.dropna().nunique()),
-            UNIDADES=(col_unid, lambda s: s.dropna().nunique()),
+            DIAS_ATIVOS=("__DATA__", "nunique"),
+            UNIDADES=(col_unid, "nunique"),
+            DIAS_PASSADOS=("__WD__", "nunique"),
        )
-       .reset_index())
+       .reset_index()
+       .astype({"VISTORIAS": np.int32, "REVISTORIAS": np.int32, "DIAS_ATIVOS": np.int32,
+                "UNIDADES": np.int32, "DIAS_PASSADOS": np.int32}))
 
 grp["LIQUIDO"] = grp["VISTORIAS"] - grp["REVISTORIAS"]
 
-def _is_workday(d):
-    return isinstance(d, date) and d.weekday() < 5
-
-def _calc_wd_passados(df_view: pd.DataFrame) -> pd.DataFrame:
-    if df_view.empty or "__DATA__" not in df_view.columns or "VISTORIADOR" not in df_view.columns:
-        return pd.DataFrame(columns=["VISTORIADOR", "DIAS_PASSADOS"])
-    mask = df_view["__DATA__"].apply(_is_workday)
-    if not mask.any():
-        vists = df_view["VISTORIADOR"].dropna().unique()
-        return pd.DataFrame({"VISTORIADOR": vists, "DIAS_PASSADOS": np.zeros(len(vists), dtype=int)})
-    out = (df_view.loc[mask].groupby("VISTORIADOR")["__DATA__"].nunique().reset_index().rename(columns={"__DATA__": "DIAS_PASSADOS"}))
-    out["DIAS_PASSADOS"] = out["DIAS_PASSADOS"].astype(int)
-    return out
-
-wd_passados = _calc_wd_passados(view)
-grp = grp.merge(wd_passados, on="VISTORIADOR", how="left").fillna({"DIAS_PASSADOS":0})
-grp["DIAS_PASSADOS"] = grp["DIAS_PASSADOS"].astype(int)
-
 # ---- METAS: usar o mês ref mais recente dentro do filtro
-if not view.empty:
-    ref = max([d for d in view["__DATA__"] if isinstance(d, date)])
-    ref_ym = f"{ref.year}-{ref.month:02d}"
-else:
-    ref_ym = None
+ref = pd.Timestamp(dias_view[-1]) if dias_view.size else pd.NaT
+ref_ym = ref.strftime("%Y-%m") if pd.notna(ref) else None
 
-if ref_ym and not df_metas_all.empty:
-    metas_ref = df_metas_all[df_metas_all["__YM__"] == ref_ym].copy()
-else:
-    metas_ref = pd.DataFrame()
+metas_ref = metas_by_month.get(ref_ym, _EMPTY_METAS) if ref_ym else _EMPTY_METAS
 
 if not metas_ref.empty:
     metas_cols = [c for c in ["VISTORIADOR","UNIDADE","TIPO","META_MENSAL","DIAS_UTEIS"] if c in metas_ref.columns]
-    grp = grp.merge(metas_ref[metas_cols], on="VISTORIADOR", how="left")
+    grp = grp.merge(metas_ref[metas_cols], on="VISTORIADOR", how="left", validate="one_to_one")
 else:
     grp["UNIDADE"] = ""
     grp["TIPO"] = ""
     grp["META_MENSAL"] = 0
     grp["DIAS_UTEIS"]  = 0
 
-for c in ["META_MENSAL","DIAS_UTEIS"]:
-    grp[c] = pd.to_numeric(grp.get(c,0), errors="coerce").fillna(0)
-
-grp["META_MENSAL"] = grp["META_MENSAL"].astype(int)
-grp["DIAS_UTEIS"]  = grp["DIAS_UTEIS"].astype(int)
-
-# ---- cálculos
-grp["META_DIA"] = np.where(grp["DIAS_UTEIS"]>0, grp["META_MENSAL"]/grp["DIAS_UTEIS"], 0.0)
-grp["FALTANTE_MES"] = np.maximum(grp["META_MENSAL"] - grp["LIQUIDO"], 0)
-grp["DIAS_RESTANTES"] = np.maximum(grp["DIAS_UTEIS"] - grp["DIAS_PASSADOS"], 0)
-grp["NECESSIDADE_DIA"] = np.where(grp["DIAS_RESTANTES"]>0, grp["FALTANTE_MES"]/grp["DIAS_RESTANTES"], 0.0)
-grp["MEDIA_DIA_ATUAL"] = np.where(grp["DIAS_PASSADOS"]>0, grp["LIQUIDO"]/grp["DIAS_PASSADOS"], 0.0)
-grp["PROJECAO_MES"] = (grp["LIQUIDO"] + grp["MEDIA_DIA_ATUAL"] * grp["DIAS_RESTANTES"]).round(0)
-grp["TENDENCIA_%"] = np.where(grp["META_MENSAL"]>0, (grp["PROJECAO_MES"]/grp["META_MENSAL"])*100, np.nan)
+# já int32 desde o loader (pd.to_numeric lá); o left join só deixa NaN para quem não tem meta
+grp[["META_MENSAL","DIAS_UTEIS"]] = grp[["META_MENSAL","DIAS_UTEIS"]].fillna(0).astype(np.int32)
+
+# ---- cálculos (arrays numpy; cada divisão só roda onde o denominador é > 0)
+meta_m = grp["META_MENSAL"].to_numpy()
+dias_u = grp["DIAS_UTEIS"].to_numpy()
+liq    = grp["LIQUIDO"].to_numpy()
+dias_p = grp["DIAS_PASSADOS"].to_numpy()
+n_grp  = len(grp)
+
+faltante = np.maximum(meta_m - liq, 0)
+restantes = np.maximum(dias_u - dias_p, 0)
+media = np.divide(liq, dias_p, out=np.zeros(n_grp), where=dias_p > 0)
+projecao = np.round(liq + media * restantes)
+
+grp["META_DIA"] = np.divide(meta_m, dias_u, out=np.zeros(n_grp), where=dias_u > 0)
+grp["FALTANTE_MES"] = faltante
+grp["DIAS_RESTANTES"] = restantes
+grp["NECESSIDADE_DIA"] = np.divide(faltante, restantes, out=np.zeros(n_grp), where=restantes > 0)
+grp["MEDIA_DIA_ATUAL"] = media
+grp["PROJECAO_MES"] = projecao
+grp["TENDENCIA_%"] = np.divide(projecao, meta_m, out=np.full(n_grp, np.nan), where=meta_m > 0) * 100
 
 # ---- NORMALIZAÇÃO DO TIPO + FILTRO SÓ PARA ESTA TABELA
-grp["TIPO_NORM"] = grp.get("TIPO","").astype(str).str.upper().str.replace("MOVEL","MÓVEL").str.strip()
-grp.loc[grp["TIPO_NORM"]=="", "TIPO_NORM"] = "—"
-
-tipo_options = [t for t in ["FIXO","MÓVEL"] if t in grp["TIPO_NORM"].unique().tolist()]
-if "—" in grp["TIPO_NORM"].unique():  # caso existam metas sem tipo
+# linhas sem PERITO/DIGITADOR (vistoriador em branco) ficam fora, como no filtro de vistoriadores
+grp = grp[grp["VISTORIADOR"].notna() & ~grp["VISTORIADOR"].isin([""])]
+# mesma normalização dos rankings (uma passada): sem meta/sem tipo vira "—"
+grp["TIPO_NORM"] = _tipo_rank(grp["TIPO"])
+
+tipos_presentes = set(grp["TIPO_NORM"].unique())
+tipo_options = [t for t in ["FIXO","MÓVEL"] if t in tipos_presentes]
+if "—" in tipos_presentes:  # caso existam metas sem tipo
     tipo_options.append("—")
 
 sel_tipos = st.multiselect(
@@ -438,38 +698,40 @@ sel_tipos = st.multiselect(
 )
 grp_tbl = grp if not sel_tipos else grp[grp["TIPO_NORM"].isin(sel_tipos)]
 
-# ---- ordenação
-grp_tbl = grp_tbl.sort_values(["PROJECAO_MES","LIQUIDO"], ascending=[False, False])
+# ---- ordenação + formatação (com emojis)
+# sort_values já devolve um frame novo: formatar nele não altera grp (sem .copy())
+fmt = grp_tbl.sort_values(["PROJECAO_MES","LIQUIDO"], ascending=[False, False])
 
-# ---- formatação (com emojis)
-fmt = grp_tbl.copy()
+def _int_str(v: np.ndarray) -> np.ndarray:
+    # inteiro arredondado (half-even, como f"{x:.0f}") em texto; NaN vira 0
+    return np.round(np.nan_to_num(v)).astype(np.int64).astype(str)
 
-def chip_tend(p):
-    if pd.isna(p): return "—"
-    p = float(p)
-    if p >= 100: return f"{p:.0f}% 🚀"
-    if p >= 95:  return f"{p:.0f}% 💪"
-    if p >= 85:  return f"{p:.0f}% 😬"
-    return f"{p:.0f}% 😟"
+def chip_tend(p: pd.Series) -> np.ndarray:
+    v = p.to_numpy(dtype=float)
+    emo = np.select([v >= 100, v >= 95, v >= 85], ["🚀", "💪", "😬"], default="😟")
+    return np.where(np.isnan(v), "—", np.char.add(_int_str(v), np.char.add("% ", emo)))
 
-def chip_nec(x):
-    try:
-        v = float(x)
-    except:
-        return "—"
-    return "0 ✅" if v <= 0 else f"{int(round(v))} 🔥"
+def chip_nec(x: pd.Series) -> np.ndarray:
+    v = x.to_numpy(dtype=float)
+    return np.where(v <= 0, "0 ✅", np.char.add(_int_str(v), " 🔥"))
+
+def chip_pct(p) -> np.ndarray:
+    # % de atingimento da meta (consolidado/ranking); aceita Series ou escalar
+    v = np.asarray(p, dtype=float)
+    emo = np.select([v >= 110, v >= 100, v >= 90, v >= 80], ["🏆", "🚀", "💪", "😬"], default="😟")
+    return np.where(np.isnan(v), "—", np.char.add(_int_str(v), np.char.add("% ", emo)))
 
 fmt["TIPO"] = fmt["TIPO_NORM"].map({"FIXO":"🏢 FIXO","MÓVEL":"🚗 MÓVEL"}).fillna("—")
-fmt["META_MENSAL"]      = fmt["META_MENSAL"].map(lambda x: f"{int(x):,}".replace(",", "."))
-fmt["DIAS_UTEIS"]       = fmt["DIAS_UTEIS"].map(lambda x: f"{int(x)}")
-fmt["META_DIA"]         = fmt["META_DIA"].map(lambda x: f"{x:,.1f}".replace(",", "X").replace(".", ",").replace("X","."))
-fmt["VISTORIAS"]        = fmt["VISTORIAS"].map(lambda x: f"{int(x)}")
-fmt["REVISTORIAS"]      = fmt["REVISTORIAS"].map(lambda x: f"{int(x)}")
-fmt["LIQUIDO"]          = fmt["LIQUIDO"].map(lambda x: f"{int(x)}")
-fmt["FALTANTE_MES"]     = fmt["FALTANTE_MES"].map(lambda x: f"{int(x)}")
-fmt["NECESSIDADE_DIA"]  = fmt["NECESSIDADE_DIA"].apply(chip_nec)
-fmt["TENDÊNCIA"]        = fmt["TENDENCIA_%"].apply(chip_tend)
-fmt["PROJECAO_MES"]     = fmt["PROJECAO_MES"].map(lambda x: "—" if pd.isna(x) else f"{int(round(x))}")
+fmt["META_MENSAL"]      = _fmt_int_br(fmt["META_MENSAL"])
+fmt["DIAS_UTEIS"]       = fmt["DIAS_UTEIS"].astype(np.int64).astype(str)
+fmt["META_DIA"]         = _fmt_dec_br(fmt["META_DIA"], 1)
+fmt["VISTORIAS"]        = fmt["VISTORIAS"].astype(np.int64).astype(str)
+fmt["REVISTORIAS"]      = fmt["REVISTORIAS"].astype(np.int64).astype(str)
+fmt["LIQUIDO"]          = fmt["LIQUIDO"].astype(np.int64).astype(str)
+fmt["FALTANTE_MES"]     = fmt["FALTANTE_MES"].astype(np.int64).astype(str)
+fmt["NECESSIDADE_DIA"]  = chip_nec(fmt["NECESSIDADE_DIA"])
+fmt["TENDÊNCIA"]        = chip_tend(fmt["TENDENCIA_%"])
+fmt["PROJECAO_MES"]     = np.where(fmt["PROJECAO_MES"].isna(), "—", _int_str(fmt["PROJECAO_MES"].to_numpy(dtype=float)))
 
 cols_show = [
     "VISTORIADOR", "UNIDADE", "TIPO",
@@ -493,11 +755,12 @@ st.markdown("<div class='section-title'>📈 Evolução diária</div>", unsafe_a
 if view.empty:
     st.caption("Sem dados no período selecionado.")
 else:
-    daily = (view.groupby("__DATA__", dropna=False)
+    # groupby já devolve as datas ordenadas e, com dropna, sem NaT: nada de filtrar/ordenar depois
+    daily = (view.groupby("__DATA__")
              .agg(VISTORIAS=("IS_REV","size"), REVISTORIAS=("IS_REV","sum"))
              .reset_index())
-    daily = daily[pd.notna(daily["__DATA__"])].sort_values("__DATA__")
     daily["LIQUIDO"] = daily["VISTORIAS"] - daily["REVISTORIAS"]
+    # já agregado: no máximo (dias × 3) linhas vão para o gráfico
     daily_melt = daily.melt(id_vars="__DATA__", value_vars=["VISTORIAS","REVISTORIAS","LIQUIDO"], var_name="Métrica", value_name="Valor")
 
     if daily_melt.empty:
@@ -522,10 +785,12 @@ st.markdown("<div class='section-title'>🏙️ Produção por Unidade (Líquido
 if view.empty:
     st.caption("Sem dados de unidades para o período.")
 else:
-    by_unid = (view.groupby(col_unid, dropna=False)
-                    .agg(liq=("IS_REV", lambda s: s.size - s.sum()))
+    by_unid = (view.groupby(col_unid, dropna=False, observed=True, sort=False)
+                    .agg(n=("IS_REV", "size"), r=("IS_REV", "sum"))
+                    .assign(liq=lambda d: d["n"] - d["r"])
                     .reset_index()
-                    .sort_values("liq", ascending=False))
+                    .sort_values("liq", ascending=False)
+                    [[col_unid, "liq"]])
     if by_unid.empty:
         st.caption("Sem produção por unidade dentro dos filtros.")
     else:
@@ -543,27 +808,37 @@ else:
 # =========================
 # Auditoria – Chassis com múltiplas vistorias
 # =========================
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _audit_chassis(sheet_keys: Tuple[Tuple[str, str], ...], unids: Tuple[str, ...], dt_ini: Optional[date],
+                   dt_fim: Optional[date], vists: Tuple[str, ...]) -> pd.DataFrame:
+    # mesma chave do _filtered_view: rerun que não mexe nos filtros já sai pronto daqui
+    view = _filtered_view(sheet_keys, unids, dt_ini, dt_fim, vists)
+    # um groupby com first/last na ordem das datas; cada planilha já vem
+    # ordenada da carga, então só reordena se o concat misturou as datas
+    by_date = view if view["__DATA__"].is_monotonic_increasing else view.sort_values("__DATA__", kind="mergesort")
+    # só chassis repetidos no filtro entram no groupby (duplicated nos códigos da category)
+    by_date = by_date[by_date[col_chassi].duplicated(keep=False).to_numpy()]
+    dup = (by_date
+                .groupby(col_chassi, dropna=False, sort=False, observed=True)
+                .agg(QTD=("VISTORIADOR","size"),
+                     PRIMEIRA_DATA=("__DATA__", "first"),
+                     ULTIMA_DATA=("__DATA__", "last"),
+                     PRIMEIRO_VIST=("VISTORIADOR", "first"),
+                     ULTIMO_VIST=("VISTORIADOR", "last"))
+                .reset_index()
+                .sort_values("QTD", ascending=False))
+    dup["PRIMEIRA_DATA"] = dup["PRIMEIRA_DATA"].dt.date
+    dup["ULTIMA_DATA"]   = dup["ULTIMA_DATA"].dt.date
+    return dup
+
 st.markdown("<div class='section-title'>🕵️ Chassis com múltiplas vistorias</div>", unsafe_allow_html=True)
 if view.empty:
     st.caption("Nenhum chassi com múltiplas vistorias dentro dos filtros.")
 else:
-    dup = (view.groupby(col_chassi, dropna=False)
-                .agg(QTD=("VISTORIADOR","size"),
-                     PRIMEIRA_DATA=("__DATA__", "min"),
-                     ULTIMA_DATA=("__DATA__", "max"))
-                .reset_index())
-    dup = dup[dup["QTD"] >= 2].sort_values("QTD", ascending=False)
+    dup = _audit_chassis(*filtro_key)
     if len(dup) == 0:
         st.caption("Nenhum chassi com múltiplas vistorias dentro dos filtros.")
     else:
-        first_map = (view.sort_values(["__DATA__"])
-                        .drop_duplicates(subset=[col_chassi], keep="first")
-                        .set_index(col_chassi)["VISTORIADOR"].to_dict())
-        last_map = (view.sort_values(["__DATA__"])
-                        .drop_duplicates(subset=[col_chassi], keep="last")
-                        .set_index(col_chassi)["VISTORIADOR"].to_dict())
-        dup["PRIMEIRO_VIST"] = dup[col_chassi].map(first_map)
-        dup["ULTIMO_VIST"]   = dup[col_chassi].map(last_map)
         st.dataframe(dup, use_container_width=True, hide_index=True)
 
 # =========================
@@ -571,34 +846,94 @@ else:
 # =========================
 TOP_LABEL = "TOP BOX"
 BOTTOM_LABEL = "BOTTOM BOX"
+# decoração das 5 posições do TOP/BOTTOM (nlargest/nsmallest devolvem no máximo 5)
+_MEDALS = np.array(["🥇","🥈","🥉","🏅","🏅"], dtype=object)
+_BADGIES = np.array(["🆘","🪫","🐢","⚠️","⚠️"], dtype=object)
+
+# colunas que os rankings usam
+RANK_COLS = ["__DATA__", "VISTORIADOR", "IS_REV"]
+
+# mesmo ttl dos caches de onde leem: o resultado não sobrevive aos dados
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _build_base_mes(filtro_key: tuple, ref_ano: int, ref_mes: int) -> pd.DataFrame:
+    # chave = tupla dos filtros: o cache não hasheia o DataFrame a cada rerun;
+    # view e metas saem dos caches de _filtered_view/_assemble
+    view_rk = _filtered_view(*filtro_key)[RANK_COLS]
+    metas_mes = _assemble(filtro_key[0])[1].get(f"{ref_ano}-{ref_mes:02d}", _EMPTY_METAS)
+    # intervalo [1º dia do mês, 1º dia do mês seguinte): 2 comparações, sem extrair ano/mês
+    mes_ini = pd.Timestamp(ref_ano, ref_mes, 1)
+    mask_mes = (view_rk["__DATA__"] >= mes_ini) & (view_rk["__DATA__"] < mes_ini + pd.offsets.MonthBegin(1))
+    # IS_REV é 0/1: size = vistorias, sum = revistorias (uma só passada no groupby)
+    g_mes = view_rk.loc[mask_mes].groupby("VISTORIADOR", dropna=False, observed=True)["IS_REV"]
+    prod_mes = (pd.DataFrame({"VISTORIAS": g_mes.size(), "REVISTORIAS": g_mes.sum()})
+                .astype(np.int32).reset_index())
+    prod_mes["LIQUIDO"] = prod_mes["VISTORIAS"] - prod_mes["REVISTORIAS"]
+
+    base_mes = prod_mes.merge(metas_mes[["VISTORIADOR","TIPO","META_MENSAL"]], on="VISTORIADOR", how="left",
+                              validate="one_to_one")
+    base_mes["TIPO"] = _tipo_rank(base_mes["TIPO"])
+    # já numérico desde o loader; o left join só deixa NaN para quem não tem meta
+    base_mes["META_MENSAL"] = base_mes["META_MENSAL"].fillna(0).astype(np.int32)
+
+    # arrays numpy direto (sem alinhamento de índice); divide só onde há meta
+    meta = base_mes["META_MENSAL"].to_numpy(dtype=np.float64)
+    vist = base_mes["VISTORIAS"].to_numpy(dtype=np.float64)
+    base_mes["ATING_%"] = np.divide(vist, meta, out=np.full(len(meta), np.nan), where=meta > 0) * 100
+    return base_mes
+
+def _int_col(s: pd.Series) -> np.ndarray:
+    return np.round(s.to_numpy()).astype(np.int64)
+
+def render_ranking(df_sub: pd.DataFrame, titulo: str, periodo: str, cols: List[Tuple[str, str]],
+                   ating_col: str, ating_label: str, meta_fmt=_int_col,
+                   sem_meta: str = "META", cabecalho: str = "") -> None:
+    # TOP/BOTTOM 5 por ating_col; cols = [(rótulo, coluna)], a 1ª é a meta (formatada com meta_fmt)
+    (meta_label, meta_col), *resto = cols
+    if df_sub.empty:
+        st.caption(f"Sem dados para {titulo} em {periodo}.")
+        return
+    # máscara em numpy: sem ninguém com meta sai antes de recortar o frame
+    com_meta = df_sub[meta_col].to_numpy() > 0
+    if not com_meta.any():
+        st.caption(f"Ninguém com {sem_meta} cadastrada para {titulo}.")
+        return
+    rk = df_sub.loc[com_meta]
+
+    def _tabela(part: pd.DataFrame, deco: np.ndarray) -> pd.DataFrame:
+        out = {" ": deco[:len(part)], "Vistoriador": part["VISTORIADOR"].to_numpy()}
+        out[meta_label] = np.asarray(meta_fmt(part[meta_col]))
+        for rot, c in resto:
+            out[rot] = part[c].to_numpy(dtype=np.int64)
+        out[ating_label] = chip_pct(part[ating_col])
+        return pd.DataFrame(out)
+
+    # seleção parcial (O(n)) em vez de ordenar tudo para usar 5+5 linhas
+    top_fmt = _tabela(rk.nlargest(5, ating_col), _MEDALS)
+    bot_fmt = _tabela(rk.nsmallest(5, ating_col), _BADGIES)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown(f"**{_nt(TOP_LABEL)}{cabecalho}**", unsafe_allow_html=True)
+        st.dataframe(top_fmt, use_container_width=True, hide_index=True)
+    with c2:
+        st.markdown(f"**{_nt(BOTTOM_LABEL)}{cabecalho}**", unsafe_allow_html=True)
+        st.dataframe(bot_fmt, use_container_width=True, hide_index=True)
+
+RANK_COLS_MES = [("Meta (mês)", "META_MENSAL"), ("Vistorias (geral)", "VISTORIAS"),
+                 ("Revistorias", "REVISTORIAS"), ("Líquido", "LIQUIDO")]
+RANK_COLS_DIA = [("Meta (dia)", "META_DIA"), ("Vistorias (dia)", "VISTORIAS_DIA"),
+                 ("Revistorias", "REVISTORIAS_DIA"), ("Líquido (dia)", "LIQUIDO_DIA")]
 
 st.markdown("---")
 st.markdown("<div class='section-title'>🧮 Consolidado do Mês + Ranking por Vistoriador</div>", unsafe_allow_html=True)
 
-datas_ok = [d for d in view["__DATA__"] if isinstance(d, date)]
-if len(datas_ok) == 0:
+# ref (data mais recente do filtro) já calculado no resumo
+if pd.isna(ref):
     st.info("Sem datas dentro dos filtros atuais para montar o consolidado do mês.")
 else:
-    ref = sorted(datas_ok)[-1]
     ref_ano, ref_mes = ref.year, ref.month
     mes_label = f"{ref_mes:02d}/{ref_ano}"
-    mask_mes = view["__DATA__"].apply(lambda d: isinstance(d, date) and d.year == ref_ano and d.month == ref_mes)
-    view_mes = view[mask_mes].copy()
-
-    prod_mes = (view_mes.groupby("VISTORIADOR", dropna=False)
-                .agg(VISTORIAS=("IS_REV","size"), REVISTORIAS=("IS_REV","sum")).reset_index())
-    prod_mes["LIQUIDO"] = prod_mes["VISTORIAS"] - prod_mes["REVISTORIAS"]
-
-    if not df_metas_all.empty:
-        metas_join = df_metas_all[df_metas_all["__YM__"] == f"{ref_ano}-{ref_mes:02d}"][["VISTORIADOR","TIPO","META_MENSAL"]].copy()
-    else:
-        metas_join = pd.DataFrame(columns=["VISTORIADOR","TIPO","META_MENSAL"])
-
-    base_mes = prod_mes.merge(metas_join, on="VISTORIADOR", how="left")
-    base_mes["TIPO"] = base_mes["TIPO"].astype(str).map(_upper_strip).replace({"MOVEL":"MÓVEL"}).replace("", "—")
-    base_mes["META_MENSAL"] = pd.to_numeric(base_mes["META_MENSAL"], errors="coerce").fillna(0)
-
-    base_mes["ATING_%"] = np.where(base_mes["META_MENSAL"]>0, (base_mes["VISTORIAS"]/base_mes["META_MENSAL"])*100, np.nan)
+    base_mes = _build_base_mes(filtro_key, ref_ano, ref_mes)
 
     meta_tot = int(base_mes["META_MENSAL"].sum())
     vist_tot = int(base_mes["VISTORIAS"].sum())
@@ -606,84 +941,29 @@ else:
     liq_tot  = int(base_mes["LIQUIDO"].sum())
     ating_g  = (vist_tot / meta_tot * 100) if meta_tot > 0 else np.nan
 
-    def chip_pct(p):
-        if pd.isna(p): return "—"
-        p = float(p)
-        if p >= 110: emo = "🏆"
-        elif p >= 100: emo = "🚀"
-        elif p >= 90: emo = "💪"
-        elif p >= 80: emo = "😬"
-        else: emo = "😟"
-        return f"{p:.0f}% {emo}"
-
     cards_mes = [
         ("Mês de referência", mes_label),
-        ("Meta (soma)", f"{meta_tot:,}".replace(",", ".")),
-        ("Vistorias (geral)", f"{vist_tot:,}".replace(",", ".")),
-        (_nt("Revistorias"), f"{rev_tot:,}".replace(",", ".")),
-        ("Líquido", f"{liq_tot:,}".replace(",", ".")),
-        ("% Ating. (sobre geral)", chip_pct(ating_g)),
+        ("Meta (soma)", _br_num(meta_tot)),
+        ("Vistorias (geral)", _br_num(vist_tot)),
+        (_nt("Revistorias"), _br_num(rev_tot)),
+        ("Líquido", _br_num(liq_tot)),
+        ("% Ating. (sobre geral)", str(chip_pct(ating_g))),
     ]
-    st.markdown('<div class="card-container">' + "".join([f"<div class=\'card\'><h4>{t}</h4><h2>{v}</h2></div>" for t, v in cards_mes]) + "</div>", unsafe_allow_html=True)
-
-    def chip_pct_row(p):
-        if pd.isna(p): return "—"
-        p = float(p)
-        if p >= 110: emo = "🏆"
-        elif p >= 100: emo = "🚀"
-        elif p >= 90: emo = "💪"
-        elif p >= 80: emo = "😬"
-        else: emo = "😟"
-        return f"{p:.0f}% {emo}"
-
-    def render_ranking(df_sub, titulo):
-        if len(df_sub) == 0:
-            st.caption(f"Sem dados para {titulo} em {mes_label}.")
-            return
-        rk = df_sub[df_sub["META_MENSAL"] > 0].copy()
-        if len(rk) == 0:
-            st.caption(f"Ninguém com META cadastrada para {titulo}.")
-            return
-        rk = rk.sort_values("ATING_%", ascending=False)
-        top = rk.head(5).copy()
-        medals = ["🥇","🥈","🥉","🏅","🏅"]
-        top["🏅"] = [medals[i] if i < len(medals) else "🏅" for i in range(len(top))]
-        top_fmt = pd.DataFrame({
-            " ": top["🏅"],
-            "Vistoriador": top["VISTORIADOR"],
-            "Meta (mês)": top["META_MENSAL"].map(lambda x: f"{int(x):,}".replace(",", ".")),
-            "Vistorias (geral)": top["VISTORIAS"].map(int),
-            "Revistorias": top["REVISTORIAS"].map(int),
-            "Líquido": top["LIQUIDO"].map(int),
-            "% Ating. (geral/meta)": top["ATING_%"].map(chip_pct_row),
-        })
-
-        bot = rk.tail(5).sort_values("ATING_%", ascending=True).copy()
-        badgies = ["🆘","🪫","🐢","⚠️","⚠️"]
-        bot["⚠️"] = [badgies[i] if i < len(badgies) else "⚠️" for i in range(len(bot))]
-        bot_fmt = pd.DataFrame({
-            " ": bot["⚠️"],
-            "Vistoriador": bot["VISTORIADOR"],
-            "Meta (mês)": bot["META_MENSAL"].map(lambda x: f"{int(x):,}".replace(",", ".")),
-            "Vistorias (geral)": bot["VISTORIAS"].map(int),
-            "Revistorias": bot["REVISTORIAS"].map(int),
-            "Líquido": bot["LIQUIDO"].map(int),
-            "% Ating. (geral/meta)": bot["ATING_%"].map(chip_pct_row),
-        })
-
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown(f"**{_nt(TOP_LABEL)} — {mes_label}**", unsafe_allow_html=True)
-            st.dataframe(top_fmt, use_container_width=True, hide_index=True)
-        with c2:
-            st.markdown(f"**{_nt(BOTTOM_LABEL)} — {mes_label}**", unsafe_allow_html=True)
-            st.dataframe(bot_fmt, use_container_width=True, hide_index=True)
+    st.markdown(_cards_html(cards_mes), unsafe_allow_html=True)
+
+    # TIPO já normalizado (_tipo_rank): particiona uma vez em vez de duas máscaras
+    partes = dict(tuple(base_mes.groupby("TIPO", sort=False)))
+    vazio = base_mes.iloc[:0]
 
     st.markdown("#### 🏢 FIXO")
-    render_ranking(base_mes[base_mes["TIPO"] == "FIXO"], "vistoriadores FIXO")
+    render_ranking(partes.get("FIXO", vazio), "vistoriadores FIXO", mes_label, RANK_COLS_MES,
+                   "ATING_%", "% Ating. (geral/meta)",
+                   meta_fmt=_fmt_int_br, cabecalho=f" — {mes_label}")
 
     st.markdown("#### 🚗 MÓVEL")
-    render_ranking(base_mes[base_mes["TIPO"].isin(["MÓVEL","MOVEL"])], "vistoriadores MÓVEL")
+    render_ranking(partes.get("MÓVEL", vazio), "vistoriadores MÓVEL", mes_label, RANK_COLS_MES,
+                   "ATING_%", "% Ating. (geral/meta)",
+                   meta_fmt=_fmt_int_br, cabecalho=f" — {mes_label}")
 
 # =========================
 # 📅 RANKING DO DIA POR VISTORIADOR (TOP/BOTTOM)
@@ -691,104 +971,67 @@ else:
 TOP_LABEL = "TOP BOX"
 BOTTOM_LABEL = "BOTTOM BOX"
 
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _build_base_dia(filtro_key: tuple, used_day: date) -> pd.DataFrame:
+    # mesma chave barata do ranking mensal
+    view_rk = _filtered_view(*filtro_key)[RANK_COLS]
+    metas_mes = _assemble(filtro_key[0])[1].get(f"{used_day.year}-{used_day.month:02d}", _EMPTY_METAS)
+    g_dia = view_rk.loc[view_rk["__DATA__"] == pd.Timestamp(used_day)].groupby("VISTORIADOR", dropna=False, observed=True)["IS_REV"]
+    prod_dia = (pd.DataFrame({"VISTORIAS_DIA": g_dia.size(), "REVISTORIAS_DIA": g_dia.sum()})
+                .astype(np.int32).reset_index())
+    prod_dia["LIQUIDO_DIA"] = prod_dia["VISTORIAS_DIA"] - prod_dia["REVISTORIAS_DIA"]
+
+    base_dia = prod_dia.merge(metas_mes[["VISTORIADOR","TIPO","META_MENSAL","DIAS_UTEIS"]], on="VISTORIADOR", how="left",
+                              validate="one_to_one")
+    base_dia["TIPO"] = _tipo_rank(base_dia["TIPO"])
+    base_dia[["META_MENSAL","DIAS_UTEIS"]] = base_dia[["META_MENSAL","DIAS_UTEIS"]].fillna(0).astype(np.int32)
+    meta = base_dia["META_MENSAL"].to_numpy(dtype=np.float64)
+    dias = base_dia["DIAS_UTEIS"].to_numpy(dtype=np.float64)
+    vist = base_dia["VISTORIAS_DIA"].to_numpy(dtype=np.float64)
+    meta_dia = np.divide(meta, dias, out=np.zeros(len(meta)), where=dias > 0)
+    base_dia["META_DIA"] = meta_dia
+    base_dia["ATING_DIA_%"] = np.divide(vist, meta_dia, out=np.full(len(meta), np.nan), where=meta_dia > 0) * 100
+    return base_dia
+
 st.markdown("---")
 st.markdown("<div class='section-title'>📅 Ranking do Dia por Vistoriador</div>", unsafe_allow_html=True)
 
-dates_avail = sorted([d for d in view["__DATA__"] if isinstance(d, date)])
-if not dates_avail:
-    st.info("Sem datas dentro dos filtros atuais para montar o ranking diário.")
-else:
-    default_day = dates_avail[-1]
-    rank_day = st.date_input("Dia para o ranking", value=st.session_state.get("rank_day_sel", default_day),
-                             format="DD/MM/YYYY", key="rank_day_sel")
-
-    if rank_day in dates_avail:
-        used_day = rank_day
-        info_msg = None
+@st.fragment
+def _ranking_do_dia(filtro_key: tuple, dates_avail: np.ndarray) -> None:
+    # fragmento: trocar o dia reexecuta só este bloco (view, resumo e mês ficam como estão)
+    # dates_avail = dias distintos já ordenados (datetime64[D]), do mesmo cache do mês de referência
+    if dates_avail.size == 0:
+        st.info("Sem datas dentro dos filtros atuais para montar o ranking diário.")
     else:
-        cands = [d for d in dates_avail if d <= rank_day]
-        used_day = cands[-1] if cands else dates_avail[-1]
-        info_msg = f"Sem dados em {rank_day.strftime('%d/%m/%Y')}. Exibindo {used_day.strftime('%d/%m/%Y')}."
+        default_day = dates_avail[-1].item()
+        rank_day = st.date_input("Dia para o ranking", value=st.session_state.get("rank_day_sel", default_day),
+                                 format="DD/MM/YYYY", key="rank_day_sel")
+
+        # último dia disponível <= rank_day (busca binária); antes do 1º dia cai no mais recente
+        i = int(np.searchsorted(dates_avail, np.datetime64(rank_day, "D"), side="right")) - 1
+        used_day = dates_avail[i].item() if i >= 0 else default_day
+        if used_day == rank_day:
+            info_msg = None
+        else:
+            info_msg = f"Sem dados em {rank_day.strftime('%d/%m/%Y')}. Exibindo {used_day.strftime('%d/%m/%Y')}."
 
-    dia_label = used_day.strftime("%d/%m/%Y")
-    if info_msg:
-        st.caption(info_msg)
-    st.caption(f"Dia exibido no ranking: **{dia_label}**")
+        dia_label = used_day.strftime("%d/%m/%Y")
+        if info_msg:
+            st.caption(info_msg)
+        st.caption(f"Dia exibido no ranking: **{dia_label}**")
 
-    view_dia = view[view["__DATA__"] == used_day].copy()
+        base_dia = _build_base_dia(filtro_key, used_day)
 
-    prod_dia = (view_dia.groupby("VISTORIADOR", dropna=False)
-                .agg(VISTORIAS_DIA=("IS_REV", "size"),
-                     REVISTORIAS_DIA=("IS_REV", "sum")).reset_index())
-    prod_dia["LIQUIDO_DIA"] = prod_dia["VISTORIAS_DIA"] - prod_dia["REVISTORIAS_DIA"]
+        # TIPO já normalizado (_tipo_rank): particiona uma vez em vez de duas máscaras
+        partes = dict(tuple(base_dia.groupby("TIPO", sort=False)))
+        vazio = base_dia.iloc[:0]
 
-    ym_day = f"{used_day.year}-{used_day.month:02d}"
-    if not df_metas_all.empty:
-        metas_join = df_metas_all[df_metas_all["__YM__"] == ym_day][["VISTORIADOR","TIPO","META_MENSAL","DIAS_UTEIS"]].copy()
-    else:
-        metas_join = pd.DataFrame(columns=["VISTORIADOR","TIPO","META_MENSAL","DIAS_UTEIS"])
-
-    base_dia = prod_dia.merge(metas_join, on="VISTORIADOR", how="left")
-    base_dia["TIPO"] = base_dia["TIPO"].astype(str).str.upper().replace({"MOVEL":"MÓVEL"}).replace("", "—")
-    for c in ["META_MENSAL","DIAS_UTEIS"]:
-        base_dia[c] = pd.to_numeric(base_dia.get(c,0), errors="coerce").fillna(0)
-    base_dia["META_DIA"] = np.where(base_dia["DIAS_UTEIS"]>0, base_dia["META_MENSAL"]/base_dia["DIAS_UTEIS"], 0.0)
-    base_dia["ATING_DIA_%"] = np.where(base_dia["META_DIA"]>0, (base_dia["VISTORIAS_DIA"]/base_dia["META_DIA"])*100, np.nan)
-
-    def chip_pct_row_dia(p):
-        if pd.isna(p): return "—"
-        p = float(p)
-        if p >= 110: emo = "🏆"
-        elif p >= 100: emo = "🚀"
-        elif p >= 90: emo = "💪"
-        elif p >= 80: emo = "😬"
-        else: emo = "😟"
-        return f"{p:.0f}% {emo}"
-
-    def render_ranking_dia(df_sub, titulo):
-        if df_sub.empty:
-            st.caption(f"Sem dados para {titulo} em {dia_label}.")
-            return
-        rk = df_sub[df_sub["META_DIA"] > 0].copy()
-        if rk.empty:
-            st.caption(f"Ninguém com META do dia cadastrada para {titulo}.")
-            return
-
-        rk = rk.sort_values("ATING_DIA_%", ascending=False)
-        top = rk.head(5).copy()
-        medals = ["🥇","🥈","🥉","🏅","🏅"]
-        top["🏅"] = [medals[i] if i < len(medals) else "🏅" for i in range(len(top))]
-        top_fmt = pd.DataFrame({
-            " ": top["🏅"], "Vistoriador": top["VISTORIADOR"],
-            "Meta (dia)": top["META_DIA"].map(lambda x: int(round(x))),
-            "Vistorias (dia)": top["VISTORIAS_DIA"].map(int),
-            "Revistorias": top["REVISTORIAS_DIA"].map(int),
-            "Líquido (dia)": top["LIQUIDO_DIA"].map(int),
-            "% Ating. (dia)": top["ATING_DIA_%"].map(chip_pct_row_dia),
-        })
-
-        bot = rk.tail(5).sort_values("ATING_DIA_%", ascending=True).copy()
-        badgies = ["🆘","🪫","🐢","⚠️","⚠️"]
-        bot["⚠️"] = [badgies[i] if i < len(badgies) else "⚠️" for i in range(len(bot))]
-        bot_fmt = pd.DataFrame({
-            " ": bot["⚠️"], "Vistoriador": bot["VISTORIADOR"],
-            "Meta (dia)": bot["META_DIA"].map(lambda x: int(round(x))),
-            "Vistorias (dia)": bot["VISTORIAS_DIA"].map(int),
-            "Revistorias": bot["REVISTORIAS_DIA"].map(int),
-            "Líquido (dia)": bot["LIQUIDO_DIA"].map(int),
-            "% Ating. (dia)": bot["ATING_DIA_%"].map(chip_pct_row_dia),
-        })
-
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown(f"**{_nt(TOP_LABEL)}**", unsafe_allow_html=True)
-            st.dataframe(top_fmt, use_container_width=True, hide_index=True)
-        with c2:
-            st.markdown(f"**{_nt(BOTTOM_LABEL)}**", unsafe_allow_html=True)
-            st.dataframe(bot_fmt, use_container_width=True, hide_index=True)
+        st.markdown("#### 🏢 FIXO")
+        render_ranking(partes.get("FIXO", vazio), "vistoriadores FIXO", dia_label, RANK_COLS_DIA,
+                       "ATING_DIA_%", "% Ating. (dia)", sem_meta="META do dia")
 
-    st.markdown("#### 🏢 FIXO")
-    render_ranking_dia(base_dia[base_dia["TIPO"] == "FIXO"], "vistoriadores FIXO")
+        st.markdown("#### 🚗 MÓVEL")
+        render_ranking(partes.get("MÓVEL", vazio), "vistoriadores MÓVEL", dia_label, RANK_COLS_DIA,
+                       "ATING_DIA_%", "% Ating. (dia)", sem_meta="META do dia")
 
-    st.markdown("#### 🚗 MÓVEL")
-    render_ranking_dia(base_dia[base_dia["TIPO"].isin(["MÓVEL","MOVEL"])], "vistoriadores MÓVEL")
+_ranking_do_dia(filtro_key, dias_view)